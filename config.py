@@ -1,67 +1,80 @@
 from dotenv import load_dotenv
+import functools
 import os
 import sys
 from logger import logging
 
+# Get the application root directory path
+if getattr(sys, "frozen", False):
+    # If it's a packaged executable
+    _APP_PATH = os.path.dirname(sys.executable)
+else:
+    # If in development environment
+    _APP_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Specify .env file path
+_DOTENV_PATH = os.path.join(_APP_PATH, ".env")
 
-class Config:
-    def __init__(self):
-        # Get the application root directory path
-        if getattr(sys, "frozen", False):
-            # If it's a packaged executable
-            application_path = os.path.dirname(sys.executable)
-        else:
-            # If in development environment
-            application_path = os.path.dirname(os.path.abspath(__file__))
 
-        # Specify .env file path
-        dotenv_path = os.path.join(application_path, ".env")
+class Config:
+    __slots__ = (
+        "imap",
+        "temp_mail",
+        "temp_mail_epin",
+        "temp_mail_ext",
+        "domain",
+        "protocol",
+        "imap_server",
+        "imap_port",
+        "imap_user",
+        "imap_pass",
+        "imap_dir",
+        "_imap_dict",
+    )
 
+    def __init__(self):
+        dotenv_path = _DOTENV_PATH
         if not os.path.exists(dotenv_path):
             raise FileNotFoundError(f"File {dotenv_path} does not exist")
 
         # Load .env file
         load_dotenv(dotenv_path)
 
+        env = os.environ
+
+        def _get(key, default=""):
+            return env.get(key, default).strip()
+
         self.imap = False
-        self.temp_mail = os.getenv("TEMP_MAIL", "").strip().split("@")[0]
-        self.temp_mail_epin = os.getenv("TEMP_MAIL_EPIN", "").strip()
-        self.temp_mail_ext = os.getenv("TEMP_MAIL_EXT", "").strip()
-        self.domain = os.getenv("DOMAIN", "").strip()
+        self.temp_mail = _get("TEMP_MAIL").split("@")[0]
+        self.temp_mail_epin = _get("TEMP_MAIL_EPIN")
+        self.temp_mail_ext = _get("TEMP_MAIL_EXT")
+        self.domain = _get("DOMAIN")
+        self.protocol = _get("IMAP_PROTOCOL", "POP3")
 
         # Load IMAP if temporary email is null
         if self.temp_mail == "null":
             self.imap = True
-            self.imap_server = os.getenv("IMAP_SERVER", "").strip()
-            self.imap_port = os.getenv("IMAP_PORT", "").strip()
-            self.imap_user = os.getenv("IMAP_USER", "").strip()
-            self.imap_pass = os.getenv("IMAP_PASS", "").strip()
-            self.imap_dir = os.getenv("IMAP_DIR", "inbox").strip()
+            self.imap_server = _get("IMAP_SERVER")
+            self.imap_port = _get("IMAP_PORT")
+            self.imap_user = _get("IMAP_USER")
+            self.imap_pass = _get("IMAP_PASS")
+            self.imap_dir = _get("IMAP_DIR", "inbox")
 
         self.check_config()
 
-    def get_temp_mail(self):
-        return self.temp_mail
-
-    def get_temp_mail_epin(self):
-        return self.temp_mail_epin
-
-    def get_temp_mail_ext(self):
-        return self.temp_mail_ext
+        self._imap_dict = None
+        if self.imap:
+            self._imap_dict = {
+                "imap_server": self.imap_server,
+                "imap_port": self.imap_port,
+                "imap_user": self.imap_user,
+                "imap_pass": self.imap_pass,
+                "imap_dir": self.imap_dir,
+            }
 
     def get_imap(self):
-        if not self.imap:
-            return False
-        return {
-            "imap_server": self.imap_server,
-            "imap_port": self.imap_port,
-            "imap_user": self.imap_user,
-            "imap_pass": self.imap_pass,
-            "imap_dir": self.imap_dir,
-        }
-
-    def get_domain(self):
-        return self.domain
+        return self._imap_dict or False
 
     def get_protocol(self):
         """Get email protocol type
@@ -69,7 +82,7 @@ class Config:
         Returns:
             str: 'IMAP' or 'POP3'
         """
-        return os.getenv('IMAP_PROTOCOL', 'POP3')
+        return self.protocol
 
     def check_config(self):
         """Check if configuration items are valid
@@ -141,6 +154,12 @@ class Config:
         logging.info(f"\033[32mDomain: {self.domain}\033[0m")
 
 
+@functools.cache
+def get_config():
+    """Get the shared Config instance, .env is only parsed on first call"""
+    return Config()
+
+
 # Usage example
 if __name__ == "__main__":
     try:
@@ -1,15 +1,13 @@
+import functools
 import os
 import platform
-import json
 import sys
-from colorama import Fore, Style
 from enum import Enum
+from pathlib import Path
 from typing import Optional
 
 from exit_cursor import ExitCursor
-import go_cursor_help
 import patch_cursor_get_machine_id
-from reset_machine import MachineIDResetter
 
 os.environ["PYTHONVERBOSE"] = "0"
 os.environ["PYINSTALLER_VERBOSE"] = "0"
@@ -19,15 +17,21 @@ import random
 from cursor_auth_manager import CursorAuthManager
 import os
 from logger import logging
-from browser_utils import BrowserManager
 from get_email_code import EmailVerificationHandler
 from logo import print_logo
-from config import Config
+from config import get_config
 from datetime import datetime
 
 # Define the EMOJI dictionary
 EMOJI = {"ERROR": "❌", "WARNING": "⚠️", "INFO": "ℹ️"}
 
+# Create the screenshots directory once, save_screenshot reports any failure
+_SCREENSHOT_DIR = "screenshots"
+try:
+	os.makedirs(_SCREENSHOT_DIR, exist_ok=True)
+except OSError:
+	pass
+
 
 class VerificationStatus(Enum):
 	"""Verification status enumeration"""
@@ -37,6 +41,32 @@ class VerificationStatus(Enum):
 	ACCOUNT_SETTINGS = "Account Settings"
 
 
+# Probe order for check_verification_success, most likely page first
+_STATUSES = tuple(
+	(status.name, status.value, status)
+	for status in (
+		VerificationStatus.ACCOUNT_SETTINGS,
+		VerificationStatus.PASSWORD_PAGE,
+		VerificationStatus.CAPTCHA_PAGE,
+	)
+)
+
+# Selectors of the verification code input boxes
+_DIGIT_SELECTORS = tuple(f"@data-index={i}" for i in range(8))
+
+# Separator between the user id and the token in WorkosCursorSessionToken
+_SESSION_TOKEN_SEP = "%3A%3A"
+
+# Checks for the account settings page and the verification code input in one round trip
+_SIGN_UP_PAGE_JS = """
+return [
+	!!document.body && document.body.innerText.includes("Account Settings"),
+	!!document.querySelector('[data-index="0"]'),
+];
+"""
+_SIGN_UP_PAGE_TIMEOUT = 120
+
+
 class TurnstileError(Exception):
 	"""Turnstile verification-related exceptions"""
 
@@ -53,18 +83,13 @@ def save_screenshot(tab, stage: str, timestamp: bool = True) -> None:
 		timestamp: Whether to add a timestamp
 	"""
 	try:
-		# Create a screenshots directory
-		screenshot_dir = "screenshots"
-		if not os.path.exists(screenshot_dir):
-			os.makedirs(screenshot_dir)
-
 		# Generate a filename
 		if timestamp:
 			filename = f"turnstile_{stage}_{int(time.time())}.png"
 		else:
 			filename = f"turnstile_{stage}.png"
 
-		filepath = os.path.join(screenshot_dir, filename)
+		filepath = os.path.join(_SCREENSHOT_DIR, filename)
 
 		# Save the screenshot
 		tab.get_screenshot(filepath)
@@ -80,9 +105,9 @@ def check_verification_success(tab) -> Optional[VerificationStatus]:
 	Returns:
 		VerificationStatus: Returns the corresponding status if verification is successful, otherwise returns None
 	"""
-	for status in VerificationStatus:
-		if tab.ele(status.value):
-			logging.info(f"Verification successful - Reached {status.name} page")
+	for name, selector, status in _STATUSES:
+		if tab.ele(selector, timeout=0.1):
+			logging.info(f"Verification successful - Reached {name} page")
 			return status
 	return None
 
@@ -112,6 +137,7 @@ def handle_turnstile(tab, max_retries: int = 2, retry_interval: tuple = (1, 2))
 			retry_count += 1
 			logging.debug(f"Attempting verification {retry_count} times")
 
+			clicked = False
 			try:
 				# Locate the verification box element
 				challenge_check = (
@@ -125,24 +151,22 @@ def handle_turnstile(tab, max_retries: int = 2, retry_interval: tuple = (1, 2))
 				if challenge_check:
 					logging.info("Detected Turnstile verification box, starting processing...")
 					# Click the verification box after a random delay
-					time.sleep(random.uniform(1, 3))
+					time.sleep(1.0 + 2.0 * random.random())
 					challenge_check.click()
 					time.sleep(2)
 
 					# Save a screenshot after verification
 					save_screenshot(tab, "clicked")
-
-					# Check the verification result
-					if check_verification_success(tab):
-						logging.info("Turnstile verification passed")
-						save_screenshot(tab, "success")
-						return True
+					clicked = True
 
 			except Exception as e:
 				logging.debug(f"Current attempt failed: {str(e)}")
 
-			# Check if verification has already been successful
+			# Check the verification result, or whether it had already succeeded
 			if check_verification_success(tab):
+				if clicked:
+					logging.info("Turnstile verification passed")
+					save_screenshot(tab, "success")
 				return True
 
 			# Retry after a random delay
@@ -176,10 +200,12 @@ def get_cursor_session_token(tab, max_attempts=3, retry_interval=2):
 
 	while attempts < max_attempts:
 		try:
-			cookies = tab.cookies()
-			for cookie in cookies:
-				if cookie.get("name") == "WorkosCursorSessionToken":
-					return cookie["value"].split("%3A%3A")[1]
+			cookies_by_name = {cookie["name"]: cookie["value"] for cookie in tab.cookies()}
+			session_token = cookies_by_name.get("WorkosCursorSessionToken")
+			if session_token:
+				token = session_token.partition(_SESSION_TOKEN_SEP)[2]
+				if token:
+					return token
 
 			attempts += 1
 			if attempts < max_attempts:
@@ -220,15 +246,15 @@ def sign_up_account(browser, tab):
 			logging.info("Filling in personal information...")
 			tab.actions.click("@name=first_name").input(first_name)
 			logging.info(f"First name entered: {first_name}")
-			time.sleep(random.uniform(1, 3))
+			time.sleep(1.0 + 2.0 * random.random())
 
 			tab.actions.click("@name=last_name").input(last_name)
 			logging.info(f"Last name entered: {last_name}")
-			time.sleep(random.uniform(1, 3))
+			time.sleep(1.0 + 2.0 * random.random())
 
 			tab.actions.click("@name=email").input(account)
 			logging.info(f"Email entered: {account}")
-			time.sleep(random.uniform(1, 3))
+			time.sleep(1.0 + 2.0 * random.random())
 
 			logging.info("Submitting personal information...")
 			tab.actions.click("@type=submit")
@@ -243,7 +269,7 @@ def sign_up_account(browser, tab):
 		if tab.ele("@name=password"):
 			logging.info("Setting password...")
 			tab.ele("@name=password").input(password)
-			time.sleep(random.uniform(1, 3))
+			time.sleep(1.0 + 2.0 * random.random())
 
 			logging.info("Submitting password...")
 			tab.ele("@type=submit").click()
@@ -259,12 +285,26 @@ def sign_up_account(browser, tab):
 
 	handle_turnstile(tab)
 
+	deadline = time.monotonic() + _SIGN_UP_PAGE_TIMEOUT
 	while True:
+		if time.monotonic() > deadline:
+			logging.error(
+				f"Timed out after {_SIGN_UP_PAGE_TIMEOUT} seconds waiting for the verification code page"
+			)
+			return False
+		try:
+			has_settings, has_code_input = tab.run_js(_SIGN_UP_PAGE_JS)
+		except Exception as e:
+			# run_js fails while the page is navigating, poll again
+			logging.debug(f"Failed to check the page state: {str(e)}")
+			time.sleep(0.5)
+			continue
+
 		try:
-			if tab.ele("Account Settings"):
+			if has_settings:
 				logging.info("Registration successful - Entered account settings page")
 				break
-			if tab.ele("@data-index=0"):
+			if has_code_input:
 				logging.info("Getting email verification code...")
 				code = email_handler.get_verification_code()
 				if not code:
@@ -273,21 +313,23 @@ def sign_up_account(browser, tab):
 
 				logging.info(f"Successfully obtained verification code: {code}")
 				logging.info("Entering verification code...")
-				i = 0
-				for digit in code:
-					tab.ele(f"@data-index={i}").input(digit)
-					time.sleep(random.uniform(0.1, 0.3))
-					i += 1
+				for selector, digit in zip(_DIGIT_SELECTORS, code):
+					tab.ele(selector).input(digit)
+					time.sleep(0.1 + 0.2 * random.random())
 				logging.info("Verification code entered")
 				break
 		except Exception as e:
 			logging.error(f"Error processing verification code: {str(e)}")
+		time.sleep(0.5)
 
+	# Time spent on the Turnstile check counts towards the processing wait
+	wait_start = time.monotonic()
 	handle_turnstile(tab)
 	wait_time = random.randint(3, 6)
-	for i in range(wait_time):
-		logging.info(f"Waiting for system processing... {wait_time-i} seconds left")
-		time.sleep(1)
+	remaining = wait_time - (time.monotonic() - wait_start)
+	if remaining > 0:
+		logging.info(f"Waiting for system processing... {remaining:.1f} seconds left")
+		time.sleep(remaining)
 
 	logging.info("Getting account information...")
 	tab.get(settings_url)
@@ -314,28 +356,26 @@ def sign_up_account(browser, tab):
 	return True
 
 
+@functools.cache
+def _load_names():
+	"""Load names-dataset.txt once, only the registration flow needs it"""
+	return tuple(sys.intern(name) for name in Path("names-dataset.txt").read_text().split())
+
+
+_PW_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%^&*"
+_PW_RANDOM = random.SystemRandom()
+
+
 class EmailGenerator:
-	def __init__(
-		self,
-		password="".join(
-			random.choices(
-				"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%^&*",
-				k=12,
-			)
-		),
-	):
-		configInstance = Config()
+	def __init__(self, password=None):
+		configInstance = get_config()
 		configInstance.print_config()
-		self.domain = configInstance.get_domain()
-		self.names = self.load_names()
-		self.default_password = password
+		self.domain = configInstance.domain
+		self.names = _load_names()
+		self.default_password = password or "".join(_PW_RANDOM.choices(_PW_ALPHABET, k=12))
 		self.default_first_name = self.generate_random_name()
 		self.default_last_name = self.generate_random_name()
 
-	def load_names(self):
-		with open("names-dataset.txt", "r") as file:
-			return file.read().split()
-
 	def generate_random_name(self):
 		"""Generate a random username"""
 		return random.choice(self.names)
@@ -358,6 +398,8 @@ class EmailGenerator:
 
 def get_user_agent():
 	"""Get the user_agent"""
+	from browser_utils import BrowserManager
+
 	try:
 		# Get the user agent using JavaScript
 		browser_manager = BrowserManager()
@@ -373,16 +415,19 @@ def get_user_agent():
 def check_cursor_version():
 	"""Check the cursor version"""
 	pkg_path, main_path = patch_cursor_get_machine_id.get_cursor_paths()
-	with open(pkg_path, "r", encoding="utf-8") as f:
-		version = json.load(f)["version"]
+	version = patch_cursor_get_machine_id.get_cursor_version(pkg_path)
 	return patch_cursor_get_machine_id.version_check(version, min_version="0.45.0")
 
 
 def reset_machine_id(greater_than_0_45):
 	if greater_than_0_45:
+		import go_cursor_help
+
 		# Prompt the user to run the script manually https://github.com/chengazhen/cursor-auto-free/blob/main/patch_cursor_get_machine_id.py
 		go_cursor_help.go_cursor_help()
 	else:
+		from reset_machine import MachineIDResetter
+
 		MachineIDResetter().reset_machine_ids()
 
 
@@ -440,6 +485,8 @@ if __name__ == "__main__":
 		# Remove "HeadlessChrome" from the user_agent
 		user_agent = user_agent.replace("HeadlessChrome", "Chrome")
 
+		from browser_utils import BrowserManager
+
 		browser_manager = BrowserManager()
 		browser = browser_manager.init_browser(user_agent)
 
@@ -2,7 +2,7 @@ from datetime import datetime
 import logging
 import time
 import re
-from config import Config
+from config import get_config
 import requests
 import email
 import imaplib
@@ -12,13 +12,14 @@ from email.parser import Parser
 
 class EmailVerificationHandler:
     def __init__(self,account):
-        self.imap = Config().get_imap()
-        self.username = Config().get_temp_mail()
-        self.epin = Config().get_temp_mail_epin()
+        config = get_config()
+        self.imap = config.get_imap()
+        self.username = config.temp_mail
+        self.epin = config.temp_mail_epin
         self.session = requests.Session()
-        self.emailExtension = Config().get_temp_mail_ext()
+        self.emailExtension = config.temp_mail_ext
         # 获取协议类型，默认为 POP3
-        self.protocol = Config().get_protocol() or 'POP3'
+        self.protocol = config.get_protocol() or 'POP3'
         self.account = account
 
     def get_verification_code(self, max_retries=5, retry_interval=60):
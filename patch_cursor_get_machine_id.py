@@ -1,32 +1,144 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import ctypes
+import functools
 import json
 import logging
+import mmap
 import os
 import platform
-import re
 import shutil
+import stat
 import sys
-import tempfile
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+logger = logging.getLogger(__name__)
 
 
 # Configure logging
 def setup_logging() -> logging.Logger:
-    """Configures and returns a logger instance"""
-    logger = logging.getLogger(__name__)
+    """Configures and returns the logger instance, only the first call adds a handler"""
     logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
     return logger
 
+# The operating system cannot change while the process is running
+_SYSTEM = platform.system()
+
+# Start of the getMachineId/getMacMachineId bodies patched by modify_main_js
+_GETTER_PREFIXES = (b"async getMachineId(){return ", b"async getMacMachineId(){return ")
+
+# Write buffer size used for the patched main.js
+_CHUNK_SIZE = 1 << 20
+
+
+def _iter_machine_id_getters(content, pos: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Finds getMachineId/getMacMachineId bodies that fall back with ??
+
+    Plain bytes.find on the literal prefixes, no regex is involved
+
+    Args:
+        content: main.js content, any bytes-like object such as an mmap
+        pos: Offset to start searching from
+
+    Yields:
+        Tuple[int, int, bytes]: (start, end, replacement) of each getter, in order
+    """
+    found = [content.find(prefix, pos) for prefix in _GETTER_PREFIXES]
+    while True:
+        candidates = [(start, i) for i, start in enumerate(found) if start >= 0]
+        if not candidates:
+            return
+        start, i = min(candidates)
+        prefix = _GETTER_PREFIXES[i]
+
+        body_start = start + len(prefix)
+        body_end = content.find(b"}", body_start)
+        if body_end < 0:
+            return
+        body = content[body_start:body_end]
+
+        # The part before ?? may not contain "?" or "{", the fallback may not be empty
+        question = body.find(b"?")
+        if (
+            question >= 0
+            and body[question : question + 2] == b"??"
+            and len(body) > question + 2
+            and b"{" not in body[:question]
+        ):
+            yield start, body_end + 1, prefix + body[question + 2 :] + b"}"
+            pos = body_end + 1
+        else:
+            pos = start + 1
+
+        for j, found_start in enumerate(found):
+            if 0 <= found_start < pos:
+                found[j] = content.find(_GETTER_PREFIXES[j], pos)
+
+
+def _write_patched_main_js(content, out_file, pos: int = 0) -> None:
+    """
+    Writes main.js with the ?? fallback prefix removed from getMachineId/getMacMachineId
+
+    Args:
+        content: main.js content, any bytes-like object such as an mmap
+        out_file: Binary file object the patched content is written to
+        pos: Offset to start searching from, content before it is copied unchanged
+    """
+    # Single scan, unmatched regions are written straight from the buffer
+    with memoryview(content) as view:
+        last = 0
+        for start, end, replacement in _iter_machine_id_getters(content, pos):
+            out_file.write(view[last:start])
+            out_file.write(replacement)
+            last = end
+        out_file.write(view[last:])
+
+
+@functools.lru_cache(maxsize=1)
+def _cursor_path_candidates() -> Tuple[Tuple[str, str], ...]:
+    """
+    Builds the possible Cursor install paths for the current operating system
+
+    Returns:
+        Tuple[Tuple[str, str], ...]: (package.json path, main.js path) candidates
 
-logger = setup_logging()
+    Raises:
+        OSError: Thrown when the system is not supported
+    """
+    if _SYSTEM == "Darwin":
+        bases = ["/Applications/Cursor.app/Contents/Resources/app"]
+    elif _SYSTEM == "Windows":
+        bases = [
+            os.getenv("USERAPPPATH")
+            or os.path.join(os.getenv("LOCALAPPDATA", ""), "Programs", "Cursor", "resources", "app")
+        ]
+    elif _SYSTEM == "Linux":
+        bases = ["/opt/Cursor/resources/app", "/usr/share/cursor/resources/app"]
+    else:
+        raise OSError(f"Unsupported operating system: {_SYSTEM}")
+
+    return tuple(
+        (os.path.join(base, "package.json"), os.path.join(base, "out/main.js"))
+        for base in bases
+    )
 
 
 def get_cursor_paths() -> Tuple[str, str]:
@@ -39,51 +151,38 @@ def get_cursor_paths() -> Tuple[str, str]:
     Raises:
         OSError: Thrown when a valid path is not found or the system is not supported
     """
-    system = platform.system()
-
-    paths_map = {
-        "Darwin": {
-            "base": "/Applications/Cursor.app/Contents/Resources/app",
-            "package": "package.json",
-            "main": "out/main.js",
-        },
-        "Windows": {
-            "base": os.path.join(
-                os.getenv("USERAPPPATH") or os.path.join(os.getenv("LOCALAPPDATA", ""), "Programs", "Cursor", "resources", "app")
-            ),
-            "package": "package.json",
-            "main": "out/main.js",
-        },
-        "Linux": {
-            "bases": ["/opt/Cursor/resources/app", "/usr/share/cursor/resources/app"],
-            "package": "package.json",
-            "main": "out/main.js",
-        },
-    }
-
-    if system not in paths_map:
-        raise OSError(f"Unsupported operating system: {system}")
-
-    if system == "Linux":
-        for base in paths_map["Linux"]["bases"]:
-            pkg_path = os.path.join(base, paths_map["Linux"]["package"])
+    candidates = _cursor_path_candidates()
+
+    if _SYSTEM == "Linux":
+        for pkg_path, main_path in candidates:
             if os.path.exists(pkg_path):
-                return (pkg_path, os.path.join(base, paths_map["Linux"]["main"]))
+                return (pkg_path, main_path)
         raise OSError("Cursor installation path not found on Linux system")
 
-    base_path = paths_map[system]["base"]
+    pkg_path, main_path = candidates[0]
     # Determine whether this folder exists in Windows, if it does not exist, prompt to create a soft link and retry
-    if system == "Windows":
-        if not os.path.exists(base_path):
+    if _SYSTEM == "Windows":
+        if not os.path.exists(os.path.dirname(pkg_path)):
             logging.info('Your Cursor may not be installed in the default path, please create a soft link, the command is as follows:')
             logging.info('cmd /c mklink /d "C:\\Users\\<username>\\AppData\\Local\\Programs\\Cursor" "default installation path"')
             logging.info('For example:')
             logging.info('cmd /c mklink /d "C:\\Users\\<username>\\AppData\\Local\\Programs\\Cursor" "D:\\SoftWare\\cursor"')
             input("\nProgram execution completed, press Enter to exit...")
-    return (
-        os.path.join(base_path, paths_map[system]["package"]),
-        os.path.join(base_path, paths_map[system]["main"]),
-    )
+    return (pkg_path, main_path)
+
+
+def get_cursor_version(pkg_path: str) -> str:
+    """
+    Reads the Cursor version from package.json
+
+    Args:
+        pkg_path: Path to package.json file
+
+    Returns:
+        str: The top-level "version" field
+    """
+    with open(pkg_path, "rb") as f:
+        return _json_loads(f.read())["version"]
 
 
 def check_system_requirements(pkg_path: str, main_path: str) -> bool:
@@ -97,21 +196,26 @@ def check_system_requirements(pkg_path: str, main_path: str) -> bool:
     Returns:
         bool: Whether the check passes
     """
-    for file_path in [pkg_path, main_path]:
-        if not os.path.isfile(file_path):
-            logger.error(f"File does not exist: {file_path}")
+    for file_path in (pkg_path, main_path):
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+            logger.error("File does not exist: %s", file_path)
             return False
 
         if not os.access(file_path, os.W_OK):
-            logger.error(f"No file write permission: {file_path}")
+            logger.error("No file write permission: %s", file_path)
             return False
 
     return True
 
 
+@functools.lru_cache(maxsize=128)
 def version_check(version: str, min_version: str = "", max_version: str = "") -> bool:
     """
-    Version number check
+    Version number check, results are cached so each distinct check is only logged once
 
     Args:
         version: Current version number
@@ -121,38 +225,42 @@ def version_check(version: str, min_version: str = "", max_version: str = "") ->
     Returns:
         bool: Whether the version number meets the requirements
     """
-    version_pattern = r"^\d+\.\d+\.\d+$"
     try:
-        if not re.match(version_pattern, version):
-            logger.error(f"Invalid version number format: {version}")
+        parts = version.split(".")
+        if len(parts) != 3 or not all(part.isascii() and part.isdigit() for part in parts):
+            logger.error("Invalid version number format: %s", version)
             return False
 
         def parse_version(ver: str) -> Tuple[int, ...]:
             return tuple(map(int, ver.split(".")))
 
-        current = parse_version(version)
+        current = tuple(map(int, parts))
 
         if min_version and current < parse_version(min_version):
-            logger.error(f"Version number {version} is less than the minimum requirement {min_version}")
+            logger.error("Version number %s is less than the minimum requirement %s", version, min_version)
             return False
 
         if max_version and current > parse_version(max_version):
-            logger.error(f"Version number {version} is greater than the maximum requirement {max_version}")
+            logger.error("Version number %s is greater than the maximum requirement %s", version, max_version)
             return False
 
         return True
 
     except Exception as e:
-        logger.error(f"Version check failed: {str(e)}")
+        logger.error("Version check failed: %s", e)
         return False
 
 
-def modify_main_js(main_path: str) -> bool:
+def modify_main_js(
+    main_path: str, wait_for_backup: Optional[Callable[[], bool]] = None
+) -> bool:
     """
     Modifies the main.js file
 
     Args:
         main_path: Path to main.js file
+        wait_for_backup: Called before main.js is replaced, waits for a backup
+            running in parallel and returns whether it succeeded
 
     Returns:
         bool: Whether the modification was successful
@@ -164,41 +272,124 @@ def modify_main_js(main_path: str) -> bool:
         original_uid = original_stat.st_uid
         original_gid = original_stat.st_gid
 
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            with open(main_path, "r", encoding="utf-8") as main_file:
-                content = main_file.read()
-
-            # Perform replacement
-            patterns = {
-                r"async getMachineId\(\)\{return [^??]+\?\?([^}]+)\}": r"async getMachineId(){return \1}",
-                r"async getMacMachineId\(\)\{return [^??]+\?\?([^}]+)\}": r"async getMacMachineId(){return \1}",
-            }
-
-            for pattern, replacement in patterns.items():
-                content = re.sub(pattern, replacement, content)
+        # An empty file cannot be mapped and has nothing to patch
+        if original_stat.st_size == 0:
+            logger.info("No changes required, main.js is left untouched")
+            return True
 
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        # Scan the mapped file directly instead of reading it into memory
+        with open(main_path, "rb") as main_file, mmap.mmap(
+            main_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as main_map:
+            first_getter = next(_iter_machine_id_getters(main_map), None)
+            if first_getter is None:
+                logger.info("No changes required, main.js is left untouched")
+                return True
+
+            # Write the patched file next to main.js so that os.replace is an atomic rename
+            tmp_path = main_path + ".new"
+            with open(tmp_path, "wb", buffering=_CHUNK_SIZE) as tmp_file:
+                _write_patched_main_js(main_map, tmp_file, first_getter[0])
+
+        # Give the new file the original's permissions and owner before it becomes visible
+        os.chmod(tmp_path, original_mode)
+        if os.name != "nt":  # Set owner on non-Windows systems
+            os.chown(tmp_path, original_uid, original_gid)
 
-        # Use shutil.copy2 to preserve file permissions
-        shutil.copy2(main_path, main_path + ".old")
-        shutil.move(tmp_path, main_path)
+        if wait_for_backup is not None and not wait_for_backup():
+            os.unlink(tmp_path)
+            return False
 
-        # Restore the original file's permissions and owner
-        os.chmod(main_path, original_mode)
-        if os.name != "nt":  # Set owner on non-Windows systems
-            os.chown(main_path, original_uid, original_gid)
+        _keep_old_main_js(main_path, original_stat)
+        os.replace(tmp_path, main_path)
 
         logger.info("File modification successful")
         return True
 
     except Exception as e:
-        logger.error(f"Error modifying file: {str(e)}")
+        logger.error("Error modifying file: %s", e)
         if "tmp_path" in locals():
-            os.unlink(tmp_path)
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
         return False
 
 
+def _copy_file(src: str, dst: str) -> None:
+    """
+    Copies a file together with its permissions and timestamps
+
+    On macOS the file is cloned with clonefile, which is copy-on-write on APFS,
+    and on Windows it is copied by CopyFileW. Everywhere else, or when those
+    fail, shutil.copy2 is used, which already copies with sendfile on Linux.
+
+    Args:
+        src: Path of the file to copy
+        dst: Path of the copy
+    """
+    # Copy to a new file and rename it over dst, dst may be hardlinked to
+    # another backup that must not be written through
+    tmp_path = dst + ".tmp"
+    copied = False
+    if sys.platform in ("darwin", "win32"):
+        try:
+            if sys.platform == "darwin":
+                libc = ctypes.CDLL(None, use_errno=True)
+                copied = libc.clonefile(os.fsencode(src), os.fsencode(tmp_path), 0) == 0
+            else:
+                copied = bool(ctypes.windll.kernel32.CopyFileW(src, tmp_path, False))
+            if copied:
+                shutil.copystat(src, tmp_path)
+        except (AttributeError, OSError):
+            copied = False
+
+    if not copied:
+        # Use shutil.copy2 to preserve file permissions
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _keep_old_main_js(main_path: str, main_stat: os.stat_result) -> None:
+    """
+    Keeps the unmodified main.js as main.js.old
+
+    The .bak made by backup_files is hardlinked when it is still a copy of
+    main.js. Otherwise main.js itself is hardlinked, so once the patched file
+    is renamed over it the old inode lives on as main.js.old. It is copied on
+    Windows or when hardlinks are not supported.
+
+    Args:
+        main_path: Path to main.js file
+        main_stat: os.stat result of the unmodified main.js
+    """
+    old_path = main_path + ".old"
+    backup_path = main_path + ".bak"
+
+    link_source = None
+    try:
+        backup_stat = os.stat(backup_path)
+        if (backup_stat.st_size, backup_stat.st_mtime_ns) == (main_stat.st_size, main_stat.st_mtime_ns):
+            link_source = backup_path
+    except FileNotFoundError:
+        pass
+    if link_source is None and os.name != "nt":
+        link_source = main_path
+
+    if link_source:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(link_source, old_path)
+            return
+        except OSError:
+            pass
+
+    _copy_file(main_path, old_path)
+
+
 def backup_files(pkg_path: str, main_path: str) -> bool:
     """
     Backs up original files
@@ -211,15 +402,17 @@ def backup_files(pkg_path: str, main_path: str) -> bool:
         bool: Whether the backup was successful
     """
     try:
-        # Only back up main.js
-        if os.path.exists(main_path):
-            backup_main = f"{main_path}.bak"
-            shutil.copy2(main_path, backup_main)
-            logger.info(f"Backed up main.js: {backup_main}")
+        # Only back up main.js, nothing to back up if it does not exist
+        backup_main = f"{main_path}.bak"
+        try:
+            _copy_file(main_path, backup_main)
+        except FileNotFoundError:
+            return True
+        logger.info("Backed up main.js: %s", backup_main)
 
         return True
     except Exception as e:
-        logger.error(f"File backup failed: {str(e)}")
+        logger.error("File backup failed: %s", e)
         return False
 
 
@@ -237,15 +430,16 @@ def restore_backup_files(pkg_path: str, main_path: str) -> bool:
     try:
         # Only restore main.js
         backup_main = f"{main_path}.bak"
-        if os.path.exists(backup_main):
+        try:
             shutil.copy2(backup_main, main_path)
-            logger.info(f"Restored main.js")
-            return True
+        except FileNotFoundError:
+            logger.error("Backup file not found")
+            return False
 
-        logger.error("Backup file not found")
-        return False
+        logger.info("Restored main.js")
+        return True
     except Exception as e:
-        logger.error(f"Failed to restore backup: {str(e)}")
+        logger.error("Failed to restore backup: %s", e)
         return False
 
 
@@ -276,11 +470,10 @@ def patch_cursor_get_machine_id(restore_mode=False) -> None:
 
         # Get version number
         try:
-            with open(pkg_path, "r", encoding="utf-8") as f:
-                version = json.load(f)["version"]
-            logger.info(f"Current Cursor version: {version}")
+            version = get_cursor_version(pkg_path)
+            logger.info("Current Cursor version: %s", version)
         except Exception as e:
-            logger.error(f"Failed to read version number: {str(e)}")
+            logger.error("Failed to read version number: %s", e)
             sys.exit(1)
 
         # Check version
@@ -290,21 +483,27 @@ def patch_cursor_get_machine_id(restore_mode=False) -> None:
 
         logger.info("Version check passed, preparing to modify files")
 
-        # Backup files
-        if not backup_files(pkg_path, main_path):
+        # Backup files while the patched main.js is being written, it only
+        # replaces main.js once the backup has succeeded
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            backup = executor.submit(backup_files, pkg_path, main_path)
+            modified = modify_main_js(main_path, wait_for_backup=backup.result)
+
+        if not backup.result():
             logger.error("File backup failed, terminating operation")
             sys.exit(1)
 
         # Modify files
-        if not modify_main_js(main_path):
+        if not modified:
             sys.exit(1)
 
         logger.info("Script execution completed")
 
     except Exception as e:
-        logger.error(f"Error occurred during execution: {str(e)}")
+        logger.error("Error occurred during execution: %s", e)
         sys.exit(1)
 
 
 if __name__ == "__main__":
+    setup_logging()
     patch_cursor_get_machine_id()
\ No newline at end of file